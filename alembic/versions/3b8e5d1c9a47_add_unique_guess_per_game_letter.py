@@ -0,0 +1,28 @@
+"""add unique guess per game letter
+
+Revision ID: 3b8e5d1c9a47
+Revises: 7fffa7419e15
+Create Date: 2026-10-15 10:12:31.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e5d1c9a47'
+down_revision: Union[str, Sequence[str], None] = '7fffa7419e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_unique_constraint('uq_guess_game_letter', 'guesses', ['game_id', 'letter'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_guess_game_letter', 'guesses', type_='unique')
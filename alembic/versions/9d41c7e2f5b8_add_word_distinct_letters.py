@@ -0,0 +1,34 @@
+"""add word distinct letters
+
+Revision ID: 9d41c7e2f5b8
+Revises: 3b8e5d1c9a47
+Create Date: 2026-10-15 11:04:52.730164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41c7e2f5b8'
+down_revision: Union[str, Sequence[str], None] = '3b8e5d1c9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('words', sa.Column('distinct_letters', sa.String(length=26), nullable=True))
+    # Backfill existing words with their sorted distinct letters
+    op.execute(
+        "UPDATE words SET distinct_letters = ("
+        "SELECT string_agg(DISTINCT c, '' ORDER BY c) "
+        "FROM regexp_split_to_table(lower(text), '') AS c)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('words', 'distinct_letters')
@@ -1,14 +1,37 @@
 # app/db.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
 
-DATABASE_URL = "postgresql+psycopg2://hangman_user:hangman_pass@db:5432/hangman_db"
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", "postgresql+asyncpg://hangman_user:hangman_pass@db:5432/hangman_db"
+)
+
+def env_flag(name: str) -> bool:
+    """Read a boolean toggle like SQL_ECHO=1 from the environment"""
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+# Raise on any lazy load the routes didn't plan for (enable in dev/CI to catch N+1 regressions)
+STRICT_LOADING = env_flag("STRICT_LOADING")
 
 # SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=True)
+# Statement logging is costly on every query, so it's opt-in via SQL_ECHO
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=env_flag("SQL_ECHO"),
+    future=True,
+    query_cache_size=1200,
+    # Sized for many concurrent requests awaiting the database on one event loop
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+)
 
 # SessionLocal class to create DB sessions
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# expire_on_commit=False keeps eager-loaded relationships usable after commit
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
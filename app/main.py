@@ -1,9 +1,30 @@
+from contextlib import asynccontextmanager
+import orjson
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from app import models
+from app.db import Base, engine
 from app.middleware import setup_middleware
 from app.routes import router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models must share app.db's Base so there is a single mapper registry and metadata
+    assert models.Base is Base, "app.models must use the Base from app.db"
+    
+    # Create all tables once per process at startup, not on every import
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson instead of the stdlib json module"""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
 # Create the app instance ONCE
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Set up middleware
 setup_middleware(app)
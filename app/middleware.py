@@ -1,9 +1,16 @@
+import os
+
 from fastapi.middleware.cors import CORSMiddleware
 
+# Comma-separated origins allowed to call the API; defaults to the React dev server
+FRONTEND_ORIGINS = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000").split(",")
+
 def setup_middleware(app):
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=["*"],
-        allow_methods=["*"],
-        allow_headers=["*"],
+        allow_origins=[origin.strip() for origin in FRONTEND_ORIGINS],
+        allow_methods=["GET", "POST"],
+        allow_headers=["content-type", "authorization"],
+        # Let browsers cache preflight responses for a day
+        max_age=86400,
     )
@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .db import Base
@@ -20,6 +20,7 @@ class Word(Base):
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String, unique=True, index=True)
     difficulty = Column(String, nullable=True)
+    distinct_letters = Column(String(26), default="")  # sorted, e.g. "hnopty" for "python"
 
     games = relationship("Game", back_populates="word")
 
@@ -37,11 +38,13 @@ class Game(Base):
 
     user = relationship("User", back_populates="games")
     word = relationship("Word", back_populates="games")
-    guesses = relationship("Guess", back_populates="game", cascade="all, delete")
+    guesses = relationship("Guess", back_populates="game", cascade="all, delete", order_by="Guess.id")
 
 
 class Guess(Base):
     __tablename__ = "guesses"
+    # One guess per letter per game; also serves as the (game_id, letter) lookup index
+    __table_args__ = (UniqueConstraint("game_id", "letter", name="uq_guess_game_letter"),)
 
     id = Column(Integer, primary_key=True, index=True)
     game_id = Column(Integer, ForeignKey("games.id"))
@@ -1,22 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.db import SessionLocal, engine, Base
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from app.db import SessionLocal, STRICT_LOADING
 from app.models import User, Word, Game, Guess
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+from typing import AsyncIterator, FrozenSet, List, Optional, Sequence, Tuple, Union
+from collections import OrderedDict
+from datetime import datetime
+import random
+import time
 
 router = APIRouter()
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
-
 # Request/Response models
 class GuessRequest(BaseModel):
     letter: str
     game_id: int
 
 class GameState(BaseModel):
+    # Built only by build_game_state from trusted values, so it skips validation
+    model_config = ConfigDict(frozen=True)
+    
     game_id: int
     word_length: int
     guessed_letters: List[str]
@@ -28,35 +36,101 @@ class GameState(BaseModel):
     status: str  # active, won, lost, cancelled
     word_revealed: Optional[str] = None  # only shown when game is over
 
+# Relationships needed to build a GameState, loaded alongside the Game itself
+# (the word comes from get_word_info's cache instead; async sessions can't lazy load)
+GAME_STATE_LOADERS = (selectinload(Game.guesses),)
+if STRICT_LOADING:
+    GAME_STATE_LOADERS += (raiseload("*"),)
+
+# Columns read-only endpoints need to build a GameState, fetched as plain rows
+GAME_STATE_COLUMNS = (Game.id, Game.status, Game.word_id)
+
+# (min_id, max_id) of the words table, cached until /init-game-data changes it
+_word_id_range = None
+
+# (id, text, difficulty, distinct letters) by word id, least recently used first;
+# words never change once added, so entries only go when /init-game-data runs
+WordInfo = Tuple[int, str, Optional[str], FrozenSet[str]]
+WORD_CACHE_SIZE = 1024
+_word_info_cache: "OrderedDict[int, WordInfo]" = OrderedDict()
+
+# Last /stats body; recomputed when a write bumps "version" or after STATS_TTL
+# seconds (so writes handled by other worker processes show up too)
+STATS_TTL = 2.0
+_stats_cache = {"version": 0, "computed_for": None, "computed_at": 0.0, "body": None}
+
 # DB session dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 def get_word_progress(word_text: str, correct_letters: List[str]) -> str:
     """Generate word progress string like '_ a _ _ l e'"""
-    return ' '.join([letter if letter.lower() in correct_letters else '_' for letter in word_text.lower()])
+    revealed = frozenset(letter.lower() for letter in correct_letters)
+    return ' '.join(letter if letter in revealed else '_' for letter in word_text.lower())
+
+async def pick_random_word(db: AsyncSession) -> Optional[Word]:
+    """Pick a random word by primary key instead of sorting the whole table"""
+    global _word_id_range
+    if _word_id_range is None:
+        min_id, max_id = (await db.execute(select(func.min(Word.id), func.max(Word.id)))).one()
+        if min_id is None:
+            return None
+        _word_id_range = (min_id, max_id)
+    
+    # Ids are mostly dense, so this almost always hits on the first try
+    for _ in range(10):
+        word = await db.get(Word, random.randint(*_word_id_range))
+        if word:
+            return word
+    
+    # Too many gaps in the id range; fall back to letting the database choose
+    return await db.scalar(select(Word).order_by(func.random()).limit(1))
+
+def get_distinct_letters(word_text: str) -> str:
+    """Sorted distinct letters of a word, as stored in Word.distinct_letters"""
+    return "".join(sorted(set(word_text.lower())))
 
-def get_game_state(game: Game, db: Session) -> GameState:
-    """Get current game state with all progress info"""
-    # Get the word
-    word = db.query(Word).filter(Word.id == game.word_id).first()
+async def get_word_info(db: AsyncSession, word_id: int) -> WordInfo:
+    """Get (id, text, difficulty, distinct letters) for a word, cached since words never change once added"""
+    info = _word_info_cache.get(word_id)
+    if info is not None:
+        _word_info_cache.move_to_end(word_id)
+        return info
+    
+    word = await db.get(Word, word_id)
     if not word:
         raise HTTPException(status_code=500, detail="Word not found for game")
+    # Rows added before distinct_letters existed may not have it filled in
+    letters = word.distinct_letters or get_distinct_letters(word.text)
+    info = (word.id, word.text, word.difficulty, frozenset(letters))
+    
+    _word_info_cache[word_id] = info
+    if len(_word_info_cache) > WORD_CACHE_SIZE:
+        _word_info_cache.popitem(last=False)
+    return info
+
+async def get_guess_rows(db: AsyncSession, game_id: int) -> Sequence[Row]:
+    """Get (letter, is_correct) rows for a game's guesses, in the order they were made"""
+    stmt = select(Guess.letter, Guess.is_correct).where(Guess.game_id == game_id).order_by(Guess.id)
+    return (await db.execute(stmt)).all()
+
+def build_game_state(
+    game: Union[Game, Row], guesses: Sequence[Union[Guess, Row]], word_info: WordInfo
+) -> GameState:
+    """Build the game state with all progress info, without writing anything
     
-    # Get all guesses for this game
-    guesses = db.query(Guess).filter(Guess.game_id == game.id).all()
+    Works from either ORM objects or the plain rows read-only endpoints fetch
+    (GAME_STATE_COLUMNS and get_guess_rows).
+    """
+    _, word_text, _, word_letters = word_info
     
     guessed_letters = [guess.letter.lower() for guess in guesses]
     correct_letters = [guess.letter.lower() for guess in guesses if guess.is_correct]
     incorrect_letters = [guess.letter.lower() for guess in guesses if not guess.is_correct]
     
     # Check win condition - all letters in word have been guessed
-    word_letters = set(word.text.lower())
-    is_won = word_letters.issubset(set(correct_letters))
+    is_won = word_letters.issubset(correct_letters)
     
     # Game settings
     max_attempts = 6
@@ -64,42 +138,39 @@ def get_game_state(game: Game, db: Session) -> GameState:
     attempts_left = max_attempts - attempts_used
     is_lost = attempts_left <= 0
     
-    # Update game status if needed
-    if is_won and game.status == "active":
-        game.status = "won"
-        db.commit()
-    elif is_lost and game.status == "active":
-        game.status = "lost"
-        db.commit()
+    # An active game ends once it's won or lost; callers persist the new status
+    status = game.status
+    if is_won and status == "active":
+        status = "won"
+    elif is_lost and status == "active":
+        status = "lost"
     
-    return GameState(
+    return GameState.model_construct(
         game_id=game.id,
-        word_length=len(word.text),
+        word_length=len(word_text),
         guessed_letters=guessed_letters,
         correct_letters=correct_letters,
         incorrect_letters=incorrect_letters,
-        word_progress=get_word_progress(word.text, correct_letters),
+        word_progress=get_word_progress(word_text, correct_letters),
         attempts_left=attempts_left,
         max_attempts=max_attempts,
-        status=game.status,
-        word_revealed=word.text if game.status in ["won", "lost"] else None
+        status=status,
+        word_revealed=word_text if status in ["won", "lost"] else None
     )
 
 # Initialize test data
 @router.post("/init-game-data")
-def init_game_data(db: Session = Depends(get_db)):
-    """Initialize game with sample words"""
-    
-    # Check if we already have data
-    word_count = db.query(func.count(Word.id)).scalar()
-    if word_count > 0:
-        return {"message": "Game data already exists", "word_count": word_count}
-    
-    # Create test user
-    test_user = User(username="player1")
-    db.add(test_user)
-    db.commit()
-    db.refresh(test_user)
+async def init_game_data(db: AsyncSession = Depends(get_db)):
+    """Initialize game with sample words (safe to call repeatedly)"""
+    
+    # Create test user, unless it already exists
+    user_id = await db.scalar(
+        pg_insert(User).values(username="player1")
+        .on_conflict_do_nothing(index_elements=["username"])
+        .returning(User.id)
+    )
+    if user_id is None:
+        user_id = await db.scalar(select(User.id).where(User.username == "player1"))
     
     # Add sample words for hangman
     sample_words = [
@@ -108,46 +179,58 @@ def init_game_data(db: Session = Depends(get_db)):
         "amazing", "brilliant", "excellent", "spectacular", "incredible"
     ]
     
-    for word_text in sample_words:
-        word = Word(text=word_text)
-        db.add(word)
+    # One statement for all words; ones already present are skipped
+    result = await db.execute(
+        pg_insert(Word).values([
+            {"text": word_text, "distinct_letters": get_distinct_letters(word_text)}
+            for word_text in sample_words
+        ]).on_conflict_do_nothing(index_elements=["text"])
+    )
+    await db.commit()
+    words_added = result.rowcount
+    
+    if not words_added:
+        return {"message": "Game data already exists", "user_id": user_id, "words_added": 0}
     
-    db.commit()
+    # Words changed, recompute the random-pick range and word cache on next use
+    global _word_id_range
+    _word_id_range = None
+    _word_info_cache.clear()
     
     return {
         "message": "Game data initialized",
-        "user_id": test_user.id,
-        "words_added": len(sample_words)
+        "user_id": user_id,
+        "words_added": words_added
     }
 
 # Start new game
 @router.post("/new-game")
-def new_game(db: Session = Depends(get_db)):
+async def new_game(db: AsyncSession = Depends(get_db)):
     """Start a new hangman game"""
     
     # Get or create user
-    user = db.query(User).first()
+    user = await db.scalar(select(User).limit(1))
     if not user:
         raise HTTPException(status_code=400, detail="No users found. Run /init-game-data first.")
     
     # Cancel any active games for this user
-    active_games = db.query(Game).filter(Game.user_id == user.id, Game.status == "active").all()
+    active_games = await db.scalars(select(Game).where(Game.user_id == user.id, Game.status == "active"))
     for game in active_games:
         game.status = "cancelled"
     
     # Get random word
-    word = db.query(Word).order_by(func.random()).first()
+    word = await pick_random_word(db)
     if not word:
         raise HTTPException(status_code=400, detail="No words found. Run /init-game-data first.")
     
-    # Create new game
-    new_game = Game(user_id=user.id, word_id=word.id, status="active")
+    # Create new game (guesses set up front so building its state needs no reload)
+    new_game = Game(user_id=user.id, word_id=word.id, status="active", guesses=[])
     db.add(new_game)
-    db.commit()
-    db.refresh(new_game)
+    await db.commit()
+    _stats_cache["version"] += 1
     
     # Return initial game state
-    game_state = get_game_state(new_game, db)
+    game_state = build_game_state(new_game, new_game.guesses, await get_word_info(db, word.id))
     
     return {
         "message": "New game started!",
@@ -156,7 +239,7 @@ def new_game(db: Session = Depends(get_db)):
 
 # Make a guess
 @router.post("/guess")
-def make_guess(guess_request: GuessRequest, db: Session = Depends(get_db)):
+async def make_guess(guess_request: GuessRequest, db: AsyncSession = Depends(get_db)):
     """Make a letter guess in the game"""
     
     # Validate input
@@ -165,27 +248,23 @@ def make_guess(guess_request: GuessRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Guess must be a single letter")
     
     # Get game
-    game = db.query(Game).filter(Game.id == guess_request.game_id).first()
+    game = await db.get(Game, guess_request.game_id, options=GAME_STATE_LOADERS)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
     if game.status != "active":
         raise HTTPException(status_code=400, detail=f"Game is {game.status}. Start a new game.")
     
-    # Check if letter already guessed
-    existing_guess = db.query(Guess).filter(
-        Guess.game_id == game.id, 
-        Guess.letter == letter
-    ).first()
-    if existing_guess:
+    # Check if letter already guessed (guesses are already loaded; the
+    # uq_guess_game_letter constraint catches concurrent duplicates on commit)
+    if any(guess.letter == letter for guess in game.guesses):
         raise HTTPException(status_code=400, detail=f"Letter '{letter}' already guessed")
     
     # Get word and check if letter is correct
-    word = db.query(Word).filter(Word.id == game.word_id).first()
-    if not word:
-        raise HTTPException(status_code=500, detail="Word not found")
+    word_info = await get_word_info(db, game.word_id)
+    _, word_text, _, word_letters = word_info
     
-    is_correct = letter in word.text.lower()
+    is_correct = letter in word_letters
     
     # Save the guess
     new_guess = Guess(
@@ -193,18 +272,30 @@ def make_guess(guess_request: GuessRequest, db: Session = Depends(get_db)):
         letter=letter,
         is_correct=is_correct
     )
+    game.guesses.append(new_guess)
     db.add(new_guess)
-    db.commit()
     
-    # Get updated game state
-    game_state = get_game_state(game, db)
+    # Get updated game state and save any status change in the same commit as the guess
+    game_state = build_game_state(game, game.guesses, word_info)
+    if game_state.status != game.status:
+        game.status = game_state.status
+        game.completed_at = datetime.utcnow()
+    
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Letter '{letter}' already guessed")
+    
+    if game_state.status != "active":
+        _stats_cache["version"] += 1
     
     result_message = "Correct guess! 🎉" if is_correct else "Incorrect guess! 😞"
     
     if game_state.status == "won":
-        result_message = f"🎉 Congratulations! You won! The word was '{word.text}'"
+        result_message = f"🎉 Congratulations! You won! The word was '{word_text}'"
     elif game_state.status == "lost":
-        result_message = f"💀 Game over! The word was '{word.text}'"
+        result_message = f"💀 Game over! The word was '{word_text}'"
     
     return {
         "message": result_message,
@@ -217,15 +308,16 @@ def make_guess(guess_request: GuessRequest, db: Session = Depends(get_db)):
 
 # Get current game state
 @router.get("/game-state")
-def get_current_game_state(db: Session = Depends(get_db)):
+async def get_current_game_state(db: AsyncSession = Depends(get_db)):
     """Get the current active game state"""
     
     # Get user's active game
-    game = db.query(Game).filter(Game.status == "active").first()
+    game = (await db.execute(select(*GAME_STATE_COLUMNS).where(Game.status == "active").limit(1))).first()
     if not game:
         raise HTTPException(status_code=404, detail="No active game found. Start a new game!")
     
-    game_state = get_game_state(game, db)
+    guesses = await get_guess_rows(db, game.id)
+    game_state = build_game_state(game, guesses, await get_word_info(db, game.word_id))
     
     return {
         "game": game_state
@@ -233,14 +325,15 @@ def get_current_game_state(db: Session = Depends(get_db)):
 
 # Get game by ID
 @router.get("/game/{game_id}")
-def get_game_by_id(game_id: int, db: Session = Depends(get_db)):
+async def get_game_by_id(game_id: int, db: AsyncSession = Depends(get_db)):
     """Get specific game state by ID"""
     
-    game = db.query(Game).filter(Game.id == game_id).first()
+    game = (await db.execute(select(*GAME_STATE_COLUMNS).where(Game.id == game_id))).one_or_none()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    game_state = get_game_state(game, db)
+    guesses = await get_guess_rows(db, game.id)
+    game_state = build_game_state(game, guesses, await get_word_info(db, game.word_id))
     
     return {
         "game": game_state
@@ -248,17 +341,28 @@ def get_game_by_id(game_id: int, db: Session = Depends(get_db)):
 
 # Get game statistics
 @router.get("/stats")
-def get_game_stats(db: Session = Depends(get_db)):
+async def get_game_stats(db: AsyncSession = Depends(get_db)):
     """Get player statistics"""
     
-    total_games = db.query(func.count(Game.id)).scalar()
-    won_games = db.query(func.count(Game.id)).filter(Game.status == "won").scalar()
-    lost_games = db.query(func.count(Game.id)).filter(Game.status == "lost").scalar()
-    active_games = db.query(func.count(Game.id)).filter(Game.status == "active").scalar()
+    version = _stats_cache["version"]
+    if (
+        _stats_cache["computed_for"] == version
+        and time.monotonic() - _stats_cache["computed_at"] < STATS_TTL
+    ):
+        return _stats_cache["body"]
+    
+    # One aggregate over all statuses instead of a count query per status
+    rows = await db.execute(select(Game.status, func.count(Game.id)).group_by(Game.status))
+    counts = dict(rows.all())
+    
+    total_games = sum(counts.values())
+    won_games = counts.get("won", 0)
+    lost_games = counts.get("lost", 0)
+    active_games = counts.get("active", 0)
     
     win_rate = (won_games / total_games * 100) if total_games > 0 else 0
     
-    return {
+    body = {
         "stats": {
             "total_games": total_games,
             "won_games": won_games,
@@ -267,8 +371,12 @@ def get_game_stats(db: Session = Depends(get_db)):
             "win_rate": round(win_rate, 1)
         }
     }
+    # Tag with the version read before querying, so a write that lands mid-query
+    # still forces the next call to recompute
+    _stats_cache.update(computed_for=version, computed_at=time.monotonic(), body=body)
+    return body
 
 # Simple test route
 @router.get("/")
-def root():
+async def root():
     return {"message": "Hangman Game API", "status": "ready"}
\ No newline at end of file